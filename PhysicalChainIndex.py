@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import hashlib
+from typing import List, Dict, Tuple
+
+import numpy as np
+from qiskit.providers import BackendV2
+
+"""
+Index of linear nearest neighbour chains on the backend coupling map,
+circuits from ExperimentCircuits only use ECRs between neighbours i, i+1.
+"""
+class PhysicalChainIndex:
+    # (backend name, calibration fingerprint) -> index
+    _cache: Dict[Tuple[str, str], PhysicalChainIndex] = {}
+    # number of paths grows exponentially (187k paths of 32 qubits on heavy hex),
+    # longer chains are found by beam search
+    EXACT_LIMIT = 16
+    BEAM_WIDTH = 512
+
+    def __init__(self, backend:BackendV2, two_qubit_gate:str = "ecr") -> None:
+        '''
+        chains are ranked by sum of -log(1 - error) of chain ECRs and readouts
+        '''
+        target = backend.target
+        self.backend_name = backend.name
+        self.n_physical = target.num_qubits
+
+        self.edge_cost = {}
+        for qargs, props in target[two_qubit_gate].items():
+            if props is None or props.error is None:
+                continue
+            edge = tuple(sorted(qargs))
+            cost = -np.log1p(-min(props.error, 1 - 1e-12))
+            # keep better direction, transpiler fixes direction without swaps
+            self.edge_cost[edge] = min(cost, self.edge_cost.get(edge, np.inf))
+
+        self.readout_cost = np.zeros(self.n_physical)
+        for qargs, props in target["measure"].items():
+            if props is not None and props.error is not None:
+                self.readout_cost[qargs[0]] = -np.log1p(-min(props.error, 1 - 1e-12))
+
+        self.neighbours: List[List[int]] = [[] for _ in range(self.n_physical)]
+        for a, b in self.edge_cost:
+            self.neighbours[a].append(b)
+            self.neighbours[b].append(a)
+
+        self.fingerprint = self.calibration_fingerprint(backend, two_qubit_gate)
+        self._chains: Dict[int, List[Tuple[float, List[int]]]] = {}
+
+    @staticmethod
+    def calibration_fingerprint(backend:BackendV2, two_qubit_gate:str = "ecr") -> str:
+        target = backend.target
+        errors = sorted(
+            (name, list(qargs), props.error)
+            for name in (two_qubit_gate, "measure")
+            for qargs, props in target[name].items()
+            if props is not None
+        )
+        return hashlib.sha1(json.dumps(errors).encode()).hexdigest()
+
+    @classmethod
+    def for_backend(cls, backend:BackendV2, two_qubit_gate:str = "ecr") -> PhysicalChainIndex:
+        """
+        Index is rebuilt only when calibration of the backend changes
+        """
+        key = (backend.name, cls.calibration_fingerprint(backend, two_qubit_gate))
+        if key not in cls._cache:
+            cls._cache[key] = cls(backend, two_qubit_gate)
+        return cls._cache[key]
+
+    def chain_cost(self, chain:List[int]) -> float:
+        cost = self.readout_cost[chain].sum()
+        for a, b in zip(chain[:-1], chain[1:]):
+            cost += self.edge_cost[tuple(sorted((a, b)))]
+        return float(cost)
+
+    def chains(self, n_qubits:int) -> List[Tuple[float, List[int]]]:
+        """
+        All simple paths with n_qubits nodes sorted by cost, each path listed once
+        (reversed path is the same chain), only up to EXACT_LIMIT qubits
+        """
+        if n_qubits > self.EXACT_LIMIT:
+            raise ValueError(f"Full chain index is limited to {self.EXACT_LIMIT} qubits, use best_chain for {n_qubits} qubits")
+        if n_qubits in self._chains:
+            return self._chains[n_qubits]
+
+        found = []
+        if n_qubits == 1:
+            found = [[q] for q in range(self.n_physical)]
+
+        def extend(path:List[int], visited:set[int]):
+            if len(path) == n_qubits:
+                if path[0] < path[-1]:
+                    found.append(list(path))
+                return
+            for q in self.neighbours[path[-1]]:
+                if q not in visited:
+                    path.append(q)
+                    visited.add(q)
+                    extend(path, visited)
+                    visited.remove(q)
+                    path.pop()
+
+        if n_qubits > 1:
+            for start in range(self.n_physical):
+                extend([start], {start})
+
+        self._chains[n_qubits] = sorted(((self.chain_cost(c), c) for c in found), key=lambda item: item[0])
+        return self._chains[n_qubits]
+
+    def beam_chains(self, n_qubits:int, beam_width:int | None = None) -> List[Tuple[float, List[int]]]:
+        """
+        Keeps beam_width cheapest partial paths, extended at either end one qubit per step.
+        Result is not guaranteed optimal, time is O(n_qubits * beam_width).
+        """
+        if beam_width is None:
+            beam_width = self.BEAM_WIDTH
+
+        beam = sorted((float(self.readout_cost[q]), [q]) for q in range(self.n_physical))[:beam_width]
+        for _ in range(n_qubits - 1):
+            candidates = {}
+            for cost, path in beam:
+                for end, new_path in ((path[-1], lambda q: path + [q]), (path[0], lambda q: [q] + path)):
+                    for q in self.neighbours[end]:
+                        if q in path:
+                            continue
+                        extended = new_path(q)
+                        key = tuple(min(extended, extended[::-1]))
+                        new_cost = cost + self.readout_cost[q] + self.edge_cost[tuple(sorted((end, q)))]
+                        if key not in candidates or new_cost < candidates[key][0]:
+                            candidates[key] = (float(new_cost), extended)
+            beam = sorted(candidates.values(), key=lambda item: item[0])[:beam_width]
+
+        return beam
+
+    def best_chain(self, n_qubits:int) -> List[int]:
+        """
+        Exact for n_qubits <= EXACT_LIMIT, beam search above
+        """
+        if n_qubits <= self.EXACT_LIMIT:
+            ranked = self.chains(n_qubits)
+        else:
+            ranked = self.beam_chains(n_qubits)
+        if len(ranked) == 0 and n_qubits <= self.EXACT_LIMIT:
+            raise ValueError(f"Backend {self.backend_name} has no linear chain of {n_qubits} qubits")
+        if len(ranked) == 0:
+            raise ValueError(f"Beam search (width {self.BEAM_WIDTH}) found no linear chain of {n_qubits} qubits on {self.backend_name}")
+        return ranked[0][1]
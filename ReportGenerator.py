@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+import hashlib
+import inspect
+from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+
+from ResultStorage import TesterResultStorage
+
+"""
+Renders result plots of Plots.ipynb from declarative figure descriptions.
+Processed results are memoised by fingerprint of their input counts and of the processing
+code, figures whose inputs did not change since last run are skipped.
+"""
+class SeriesSpec:
+    def __init__(self, start:int, stop:int, measurement:str, label:str, name_swaps:list[tuple[int, int]] = [], sim_swaps:list[tuple[int, int]] = []) -> None:
+        '''
+        Selects every second result of storage from start to stop (the notebook slices [start:stop:2]),
+        measurement is SHORT or XOR.
+        name_swaps / sim_swaps are index pairs of the whole storage swapped before slicing
+        (corrected variants of Plots.ipynb)
+        '''
+        self.start = start
+        self.stop = stop
+        self.measurement = measurement
+        self.label = label
+        self.name_swaps = name_swaps
+        self.sim_swaps = sim_swaps
+
+    def select(self, storage:TesterResultStorage) -> TesterResultStorage:
+        names = list(storage.names)
+        simulated_counts = list(storage.simulated_counts)
+        for i, j in self.name_swaps:
+            names[i], names[j] = names[j], names[i]
+        for i, j in self.sim_swaps:
+            simulated_counts[i], simulated_counts[j] = simulated_counts[j], simulated_counts[i]
+
+        return TesterResultStorage(
+            names[self.start:self.stop:2],
+            simulated_counts[self.start:self.stop:2],
+            storage.real_counts[self.start:self.stop:2]
+        )
+
+
+class FigureSpec:
+    def __init__(self, file_name:str, series:list[SeriesSpec], x_axis:str, xlabel:str) -> None:
+        '''
+        x_axis is Q (number of qubits) or L (number of layers)
+        '''
+        self.file_name = file_name
+        self.series = series
+        self.x_axis = x_axis
+        self.xlabel = xlabel
+
+    def description(self) -> dict:
+        return {
+            "file_name": self.file_name,
+            "x_axis": self.x_axis,
+            "xlabel": self.xlabel,
+            "series": [(s.start, s.stop, s.measurement, s.label, s.name_swaps, s.sim_swaps) for s in self.series]
+        }
+
+
+def _family(file_name:str, start:int, stop:int, x_axis:str, xlabel:str) -> FigureSpec:
+    return FigureSpec(file_name, [
+        SeriesSpec(start, stop, "SHORT", "Short measurement"),
+        SeriesSpec(start + 1, stop, "XOR", "XOR measurement")
+    ], x_axis, xlabel)
+
+
+# figures of Plots.ipynb for IBM_BRISBANE_4_5
+DEFAULT_FIGURES = [
+    _family("pure_parallel_short_xor.pdf", 48, 96, "Q", "Number of copies"),
+    _family("pure_sequential_short_xor.pdf", 0, 48, "L", "Number of copies"),
+    _family("hybrid120_short_xor_new.pdf", 96, 132, "Q", "Number of qubits"),
+    _family("hybrid240_short_xor_new.pdf", 132, 168, "Q", "Number of qubits"),
+    _family("hybrid1200_short_xor_new.pdf", 168, 204, "Q", "Number of qubits"),
+    FigureSpec("pure_parallel_xor_corrected_new.pdf", [
+        SeriesSpec(49, 96, "XOR", "XOR measurement"),
+        SeriesSpec(49, 96, "XOR", "XOR measurement corrected", name_swaps=[(73, 75), (77, 79), (81, 83), (85, 87)])
+    ], "Q", "Number of copies"),
+    FigureSpec("pure_parallel_short_corrected_new.pdf", [
+        SeriesSpec(48, 96, "SHORT", "Short measurement"),
+        SeriesSpec(48, 96, "SHORT", "Short measurement corrected", sim_swaps=[(64, 66), (72, 74), (76, 78), (84, 86), (88, 90), (92, 94)])
+    ], "Q", "Number of copies"),
+]
+
+
+def _process(storage:TesterResultStorage, measurement:str) -> Dict[str, Dict[str, int]]:
+    if measurement == "SHORT":
+        return storage.process_results_short()
+    return storage.process_results_xor()
+
+
+def _render(path:str, curves:list[tuple[list[int], list[float], str]], xlabel:str) -> str:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.rcParams.update({
+        "text.usetex": False,  # Disable LaTeX
+        "font.family": "serif",
+        "font.size": 14
+    })
+    styles = [
+        dict(marker='o', linestyle='-', linewidth=2.5, color='#1f77b4'),
+        dict(marker='s', linestyle='--', linewidth=2.5, color='#d62728')
+    ]
+
+    fig = plt.figure(figsize=(8, 6))
+    for (x_vals, y_vals, label), style in zip(curves, styles):
+        plt.plot(x_vals, y_vals, label=label, **style)
+
+    plt.xlabel(xlabel, fontsize=20)
+    plt.ylabel(r'Probability', fontsize=20)
+    plt.xticks(fontsize=16)
+    plt.yticks(fontsize=16)
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.legend(loc="upper right", fontsize=16, frameon=True)
+
+    plt.tight_layout()
+    plt.savefig(path, format="pdf", bbox_inches="tight")
+    plt.close(fig)
+    return path
+
+
+class ReportGenerator:
+    def __init__(self, storage:TesterResultStorage, output_dir:str = "./plots", max_workers:int | None = None) -> None:
+        '''
+        processed results and rendered figure inputs are cached in output_dir
+        (.processed_cache.json, .report_manifest.json)
+        '''
+        self.storage = storage
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+
+        self.cache_path = os.path.join(output_dir, ".processed_cache.json")
+        self.manifest_path = os.path.join(output_dir, ".report_manifest.json")
+        self.processed = self._load_json(self.cache_path)
+        self.manifest = self._load_json(self.manifest_path)
+
+        # editing classification or plotting code invalidates cached results and figures
+        self.processing_version = hashlib.sha256((inspect.getsource(TesterResultStorage) + inspect.getsource(_process)).encode()).hexdigest()
+        self.render_version = hashlib.sha256(inspect.getsource(_render).encode()).hexdigest()
+
+    @staticmethod
+    def _load_json(path:str) -> dict:
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def fingerprint(self, storage:TesterResultStorage, measurement:str) -> str:
+        data = [self.processing_version, measurement, storage.names, storage.simulated_counts, storage.real_counts]
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def _process_all(self, selections:Dict[str, tuple[TesterResultStorage, str]], used:set[str]) -> None:
+        """
+        Processes selections missing in cache in parallel, selections are keyed by fingerprint.
+        Cache keeps only fingerprints in used (inputs of current figures)
+        """
+        missing = [key for key in selections if key not in self.processed]
+        stale = [key for key in self.processed if key not in used]
+        if len(missing) == 0 and len(stale) == 0:
+            return
+
+        for key in stale:
+            del self.processed[key]
+
+        if len(missing) > 0:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                results = pool.map(_process, *zip(*(selections[key] for key in missing)))
+                for key, processed in zip(missing, results):
+                    self.processed[key] = processed
+
+        with open(self.cache_path, "w") as f:
+            json.dump(self.processed, f)
+
+    def curve(self, series:SeriesSpec, fingerprint:str, x_axis:str) -> tuple[list[int], list[float], str]:
+        pattern = r'Q(\d+)L(\d+)' # reg exp pattern for n of qubits and layers extraction
+        x_vals = []
+        y_vals = []
+        for ident, success in TesterResultStorage.success_probabilities(self.processed[fingerprint]).items():
+            q_num, l_num = re.match(pattern, ident).groups()
+            x_vals.append(int(q_num) if x_axis == "Q" else int(l_num))
+            y_vals.append(success)
+        return x_vals, y_vals, series.label
+
+    def render_all(self, figures:List[FigureSpec] = DEFAULT_FIGURES, force:bool = False) -> list[str]:
+        """
+        Renders figures in process pool, returns paths of rendered files (skipped ones are not listed)
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        selections = {}
+        figure_keys = []
+        for figure in figures:
+            keys = []
+            for series in figure.series:
+                selected = series.select(self.storage)
+                key = self.fingerprint(selected, series.measurement)
+                selections[key] = (selected, series.measurement)
+                keys.append(key)
+            figure_keys.append(keys)
+
+        to_render = []
+        for figure, keys in zip(figures, figure_keys):
+            path = os.path.join(self.output_dir, figure.file_name)
+            inputs = hashlib.sha256(json.dumps([self.processing_version, self.render_version, figure.description(), keys]).encode()).hexdigest()
+            if not force and self.manifest.get(figure.file_name) == inputs and os.path.exists(path):
+                continue
+            to_render.append((figure, keys, path, inputs))
+
+        used = {key for keys in figure_keys for key in keys}
+        self._process_all({key: selections[key] for _, keys, _, _ in to_render for key in keys}, used)
+
+        rendered = []
+        if len(to_render) == 0:
+            return rendered
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = []
+            for figure, keys, path, inputs in to_render:
+                curves = [self.curve(series, key, figure.x_axis) for series, key in zip(figure.series, keys)]
+                futures.append((figure, inputs, pool.submit(_render, path, curves, figure.xlabel)))
+
+            for figure, inputs, future in futures:
+                rendered.append(future.result())
+                self.manifest[figure.file_name] = inputs
+
+        with open(self.manifest_path, "w") as f:
+            json.dump(self.manifest, f)
+
+        return rendered
+
+
+if __name__ == "__main__":
+    generator = ReportGenerator(TesterResultStorage.load_from_directory("./IBM_BRISBANE_4_5"))
+    for path in generator.render_all():
+        print(path)
@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import os
+import json
+from typing import List, Dict, TYPE_CHECKING
+import re
+from copy import deepcopy
+
+if TYPE_CHECKING:
+    import numpy as np
+    from UnifiedTester import UnifiedTester
+
+"""
+Result storages and classification of counts, no qiskit (and no numpy until SX results are
+processed) is imported, so analysis only runs start fast.
+"""
+
+class TesterResultStorage:
+    def __init__(self, names: List[str], simulated_counts: List[Dict[str, int]], real_counts: List[Dict[str, int]], circuit_map: List[int] | None = None) -> None:
+        '''
+        Assumes name format Q<n_qubits>_L<m_layers>_{RZ,IDENT}_{SHORT,XOR}
+        circuit_map[i] is index of executed (deduplicated) circuit which produced counts of names[i]
+        '''
+        self.names = names
+        self.simulated_counts = simulated_counts
+        self.real_counts = real_counts
+        self.circuit_map = circuit_map
+        self.processed_results = None
+
+    def copy(self) -> TesterResultStorage:
+        return TesterResultStorage(
+            deepcopy(self.names),
+            deepcopy(self.simulated_counts),
+            deepcopy(self.real_counts),
+            deepcopy(self.circuit_map)
+        )
+
+    def save_to_directory(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        
+        with open(os.path.join(directory, "names.json"), "w") as f:
+            json.dump(self.names, f)
+        
+        with open(os.path.join(directory, "simulated_counts.json"), "w") as f:
+            json.dump(self.simulated_counts, f)
+        
+        with open(os.path.join(directory, "real_counts.json"), "w") as f:
+            json.dump(self.real_counts, f)
+
+        if self.circuit_map is not None:
+            with open(os.path.join(directory, "circuit_map.json"), "w") as f:
+                json.dump(self.circuit_map, f)
+
+    @classmethod
+    def load_from_directory(cls, directory: str):
+        with open(os.path.join(directory, "names.json"), "r") as f:
+            names = json.load(f)
+        
+        with open(os.path.join(directory, "simulated_counts.json"), "r") as f:
+            simulated_counts = json.load(f)
+        
+        with open(os.path.join(directory, "real_counts.json"), "r") as f:
+            real_counts = json.load(f)
+
+        circuit_map = None
+        if os.path.exists(os.path.join(directory, "circuit_map.json")):
+            with open(os.path.join(directory, "circuit_map.json"), "r") as f:
+                circuit_map = json.load(f)
+        
+        return cls(names, simulated_counts, real_counts, circuit_map)
+
+    @classmethod
+    def from_unified_tester(cls, tester:UnifiedTester):
+        if tester.real_counts == None:
+            assert "UnifiedTester has no real counts"
+        
+        return cls(tester.circuit_names, tester.sim_counts, tester.real_counts, tester.circuit_map)
+
+    @staticmethod
+    def counts_within_xor_dist(counts: Dict[str,int], origin: str, dist: int) -> int:
+        final = 0
+        for bitstring, count in counts.items():
+            hamming_distance = sum(bit1 != bit2 for bit1, bit2 in zip(bitstring, origin))
+            if hamming_distance <= dist:
+                final = final + count
+        return final
+    
+    @staticmethod
+    def counts_at_xor_dist(counts: Dict[str,int], origin: str, dist: int) -> int:
+        final = 0
+        for bitstring, count in counts.items():
+            hamming_distance = sum(bit1 != bit2 for bit1, bit2 in zip(bitstring, origin))
+            if hamming_distance == dist:
+                final = final + count
+        return final
+    
+    @staticmethod
+    def success_probabilities(processed_results: Dict[str, Dict[str, int]]) -> Dict[str, float]:
+        """
+        Fraction of right answers (guesses included) in output of process_results_{short,xor}
+        """
+        success = {}
+        for ident, table in processed_results.items():
+            right = table['TP'] + table['TN'] + table['GTP'] + table['GTN']
+            success[ident] = right / sum(table.values())
+        return success
+
+    @staticmethod
+    def hamming_distance_to_set(string_set: set[str], origin: str) -> int:
+        final = len(origin)
+        for bitstring in string_set:
+            hamming_distance = sum(bit1 != bit2 for bit1, bit2 in zip(bitstring, origin))
+            if hamming_distance < final:
+                final = hamming_distance
+        return final
+    
+    
+    def process_results_xor(self):
+        """
+        Consider all ones as identity and zeros as rotation
+        Corectly identifying RZ is true positive
+        Corectly identifying I is true negative
+        Correct results is RZ, but is identified as I is false negative
+        Correct results is I, but is identified as RZ is false positive
+        Also computes random guess towards either I or RZ which cant be determined (G prefix)
+        """
+        pattern = r'Q(\d+)_L(\d+)_.*' # reg exp pattern for n of qubits and layers extraction
+
+        self.processed_results = {}
+        
+        for i,name in enumerate(self.names):
+            q_num, l_num = re.match(pattern, name).groups()
+
+            ident = f'Q{q_num}L{l_num}'
+
+            self.processed_results[ident] = {}
+
+        for i,name in enumerate(self.names):
+            q_num, l_num = re.match(pattern, name).groups()
+            
+            ident = f'Q{q_num}L{l_num}'
+
+            n_qubits = int(q_num)
+
+            bin_clas_dict = self.processed_results[ident]
+
+            if "TP" not in bin_clas_dict.keys():
+                bin_clas_dict["TP"] = 0
+            if "FN" not in bin_clas_dict.keys():
+                bin_clas_dict["FN"] = 0
+            if "TN" not in bin_clas_dict.keys():
+                bin_clas_dict["TN"] = 0
+            if "FP" not in bin_clas_dict.keys():
+                bin_clas_dict["FP"] = 0
+            
+            if "RZ" in name:
+                bin_clas_dict["TP"] = self.counts_within_xor_dist(self.real_counts[i], "0"*n_qubits, (n_qubits-1)//2)
+                bin_clas_dict["FN"] = self.counts_within_xor_dist(self.real_counts[i], "1"*n_qubits, (n_qubits-1)//2)
+            if "IDENT" in name:
+                bin_clas_dict["TN"] = self.counts_within_xor_dist(self.real_counts[i], "1"*n_qubits, (n_qubits-1)//2)
+                bin_clas_dict["FP"] = self.counts_within_xor_dist(self.real_counts[i], "0"*n_qubits, (n_qubits-1)//2)  
+            
+            if "GTP" not in bin_clas_dict.keys():
+                bin_clas_dict["GTP"] = 0
+            if "GFN" not in bin_clas_dict.keys():
+                bin_clas_dict["GFN"] = 0
+            if "GTN" not in bin_clas_dict.keys():
+                bin_clas_dict["GTN"] = 0
+            if "GFP" not in bin_clas_dict.keys():
+                bin_clas_dict["GFP"] = 0
+
+            if n_qubits % 2 == 0:
+                # random guess for strings with same nuber of zeros and ones
+                counts_to_guess = self.counts_at_xor_dist(self.real_counts[i], "0"*n_qubits, n_qubits//2)
+                if "RZ" in name:
+                    bin_clas_dict["GTP"] = counts_to_guess // 2
+                    bin_clas_dict["GFN"] = counts_to_guess - bin_clas_dict["GTP"]
+                if "IDENT" in name:
+                    bin_clas_dict["GTN"] = counts_to_guess // 2
+                    bin_clas_dict["GFP"] = counts_to_guess - bin_clas_dict["GTN"]
+
+            self.processed_results[ident] = bin_clas_dict
+
+
+        return self.processed_results
+    
+
+    def process_results_short(self):
+        """
+        Corectly identifying RZ is true positive
+        Corectly identifying I is true negative
+        Correct results is RZ, but is identified as I is false negative
+        Correct results is I, but is identified as RZ is false positive
+        Also computes random guess towards either I or RZ which cant be determined (G prefix)
+        """
+        pattern = r'Q(\d+)_L(\d+)_.*' # reg exp pattern for n of qubits and layers extraction
+
+        self.processed_results = {}
+        rz_combinations = {}
+        id_combinations = {}
+
+        for i,name in enumerate(self.names):
+            q_num, l_num = re.match(pattern, name).groups()
+
+            circuit_idx = f'Q{q_num}L{l_num}'
+
+            self.processed_results[circuit_idx] = {}
+            rz_combinations[circuit_idx] = set()
+            id_combinations[circuit_idx] = set()
+
+        for i,name in enumerate(self.names):
+            q_num, l_num = re.match(pattern, name).groups()
+
+            circuit_idx = f'Q{q_num}L{l_num}'
+
+            if "RZ" in name:
+                rz_combinations[circuit_idx] = rz_combinations[circuit_idx].union(set(self.simulated_counts[i].keys()))
+
+            if "IDENT" in name:
+                id_combinations[circuit_idx] = id_combinations[circuit_idx].union(set(self.simulated_counts[i].keys()))
+
+        for i,name in enumerate(self.names):
+            q_num, l_num = re.match(pattern, name).groups()
+            
+            circuit_idx = f'Q{q_num}L{l_num}'
+
+            bin_clas_dict = self.processed_results[circuit_idx]
+
+            if "TP" not in bin_clas_dict.keys():
+                bin_clas_dict["TP"] = 0
+            if "FN" not in bin_clas_dict.keys():
+                bin_clas_dict["FN"] = 0
+            if "TN" not in bin_clas_dict.keys():
+                bin_clas_dict["TN"] = 0
+            if "FP" not in bin_clas_dict.keys():
+                bin_clas_dict["FP"] = 0
+
+            if "GTP" not in bin_clas_dict.keys():
+                bin_clas_dict["GTP"] = 0
+            if "GFN" not in bin_clas_dict.keys():
+                bin_clas_dict["GFN"] = 0
+            if "GTN" not in bin_clas_dict.keys():
+                bin_clas_dict["GTN"] = 0
+            if "GFP" not in bin_clas_dict.keys():
+                bin_clas_dict["GFP"] = 0
+            
+
+            if "RZ" in name:
+                counts_rz = 0
+                counts_id = 0
+
+                # random guess for strings that have same distance from both answears
+                counts_to_guess = 0
+
+                for key in self.real_counts[i]:
+                    dist_to_rz = self.hamming_distance_to_set(rz_combinations[circuit_idx], key)
+                    dist_to_id = self.hamming_distance_to_set(id_combinations[circuit_idx], key)
+
+                    if dist_to_rz < dist_to_id:
+                        counts_rz += self.real_counts[i][key] 
+                    elif dist_to_rz > dist_to_id:
+                        counts_id += self.real_counts[i][key]
+                    else:
+                        counts_to_guess += self.real_counts[i][key]
+
+                bin_clas_dict["TP"] += counts_rz
+                bin_clas_dict["FN"] += counts_id
+                bin_clas_dict["GTP"] += counts_to_guess // 2
+                bin_clas_dict["GFN"] += counts_to_guess - counts_to_guess // 2
+            
+            if "IDENT" in name:
+                counts_rz = 0
+                counts_id = 0
+
+                # random guess for strings that have same distance from both answears
+                counts_to_guess = 0
+
+                for key in self.real_counts[i]:
+                    dist_to_rz = self.hamming_distance_to_set(rz_combinations[circuit_idx], key)
+                    dist_to_id = self.hamming_distance_to_set(id_combinations[circuit_idx], key)
+
+                    if dist_to_rz < dist_to_id:
+                        counts_rz += self.real_counts[i][key] 
+                    elif dist_to_rz > dist_to_id:
+                        counts_id += self.real_counts[i][key]
+                    else:
+                        counts_to_guess += self.real_counts[i][key]
+
+                bin_clas_dict["TN"] += counts_id
+                bin_clas_dict["FP"] += counts_rz
+                bin_clas_dict["GTN"] = counts_to_guess // 2
+                bin_clas_dict["GFP"] = counts_to_guess - counts_to_guess // 2
+
+
+            self.processed_results[circuit_idx] = bin_clas_dict
+
+        return self.processed_results
+
+
+class SXResultStorage:
+    def __init__(self, n_copies: int, counts: List[Dict[str, int]], physical_qubits: List[List[int]], mitigated: List[Dict[str, float]] | None = None) -> None:
+        '''
+        Results of the SX parity experiment (IBM_BRISBANE_SX/exp_with_sx_public.ipynb).
+        Circuits come in pairs for b = 1, 2, 4, ... qubits with a = n_copies // b layers,
+        first of pair rotates by -pi/(2N) (success is even parity), second by +pi/(2N) (odd parity)
+        '''
+        self.n_copies = n_copies
+        self.counts = counts
+        self.physical_qubits = physical_qubits
+        self.mitigated = mitigated
+
+        self.b = [len(qubits) for qubits in physical_qubits]
+        self.a = [n_copies // b for b in self.b]
+        self.phase_sign = [-1 if i % 2 == 0 else 1 for i in range(len(counts))]
+
+        self._packed = None
+
+    @classmethod
+    def load_from_file(cls, path: str, n_copies: int | None = None) -> SXResultStorage:
+        """
+        Reads file written by save_to_file, or bare list of counts followed by list of physical
+        qubits (sx_<N_factor>_<G>_real.json), there n_copies = 2**N_factor * G is taken from file name when missing
+        """
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        if isinstance(data, dict):
+            return cls(
+                data["n_copies"] if n_copies is None else n_copies,
+                data["counts"],
+                data["physical_qubits"],
+                data.get("mitigated")
+            )
+
+        if n_copies is None:
+            match = re.match(r'sx_(\d+)_(\d+)', os.path.basename(path))
+            if match is None:
+                raise ValueError(f"Cannot determine n_copies from file name {os.path.basename(path)}, expected sx_<N_factor>_<G>*.json or n_copies argument")
+            n_factor, g = match.groups()
+            n_copies = 2**int(n_factor) * int(g)
+
+        return cls(n_copies, data[:-1], data[-1])
+
+    def save_to_file(self, path: str):
+        """
+        Stores counts together with n_copies and mitigated distributions
+        """
+        with open(path, "w") as f:
+            json.dump({
+                "n_copies": self.n_copies,
+                "counts": self.counts,
+                "physical_qubits": self.physical_qubits,
+                "mitigated": self.mitigated
+            }, f)
+
+    def mitigate(self, mit, cal_shots: int = 10000) -> List[Dict[str, float]]:
+        """
+        mit is mthree.M3Mitigation, calibration is done on physical qubits of every circuit
+        """
+        self.mitigated = []
+        for counts, qubits in zip(self.counts, self.physical_qubits):
+            mit.cals_from_system(qubits, cal_shots)
+            quasi = mit.apply_correction(counts, qubits)
+            self.mitigated.append(dict(quasi.nearest_probability_distribution()))
+        self._packed = None
+        return self.mitigated
+
+    @staticmethod
+    def _pack(distributions: List[Dict[str, float]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns (parity of every outcome, weight of every outcome, index of its circuit)
+        """
+        import numpy as np
+
+        # number of ones in every byte value
+        popcount = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+        parities = []
+        weights = []
+        segments = []
+        for i, dist in enumerate(distributions):
+            keys = list(dist.keys())
+            n_bits = len(keys[0])
+            bits = np.frombuffer("".join(keys).encode(), dtype=np.uint8).reshape(len(keys), n_bits) == ord("1")
+            packed = np.packbits(bits, axis=1)
+            parities.append(popcount[packed].sum(axis=1, dtype=np.int64) & 1)
+            weights.append(np.fromiter(dist.values(), dtype=float, count=len(keys)))
+            segments.append(np.full(len(keys), i))
+        return np.concatenate(parities), np.concatenate(weights), np.concatenate(segments)
+
+    def success_probabilities(self) -> Dict[str, np.ndarray]:
+        """
+        Probability of success for every pair (b = 1, 2, 4, ...), raw and mitigated (when present)
+        computed in one batch
+        """
+        import numpy as np
+
+        if self._packed is None:
+            datasets = [self.counts] if self.mitigated is None else [self.counts, self.mitigated]
+            self._packed = self._pack([dist for dataset in datasets for dist in dataset])
+
+        parity, weight, segment = self._packed
+        n_segments = segment[-1] + 1
+        expected = (np.arange(n_segments) % 2)[segment]
+
+        success = np.bincount(segment, weights=weight*(parity == expected), minlength=n_segments)
+        total = np.bincount(segment, weights=weight, minlength=n_segments)
+        # average over pair of -phi and +phi circuits
+        pair_success = (success/total).reshape(-1, 2).mean(axis=1)
+
+        n_pairs = len(self.counts) // 2
+        result = {"raw": pair_success[:n_pairs]}
+        if self.mitigated is not None:
+            result["mitigated"] = pair_success[n_pairs:]
+        return result
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import re
+from typing import List, Dict
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.providers import BackendV2
+from qiskit.quantum_info import Statevector
+
+from ExperimentCircuits import ExperimentCircuits
+from ResultStorage import TesterResultStorage
+
+"""
+Analytic estimate of the SHORT and XOR success probabilities of the hybrid
+discrimination circuits from backend calibration data, without simulation.
+Only as good as the calibration snapshot of the backend, e.g. FakeBrisbane predicts 0.90 for
+SHORT at Q=4, IBM_BRISBANE_4_5 (May 2025) measured 0.62 because of one bad qubit
+(~20 % flips of qubit 3), SHORT supports of RZ and IDENT are 1 bit apart.
+"""
+class SuccessPredictor:
+
+    def __init__(self, backend:BackendV2, layout:list[int] | None = None) -> None:
+        '''
+        layout[i] is the physical qubit of logical qubit i, trivial layout is used when missing
+        (same as optimization_level=0 without initial_layout)
+        '''
+        self.target = backend.target
+        self.layout = layout
+        self._per_qubit_cache = {}
+
+    def physical_qubits(self, n_qubits:int) -> list[int]:
+        if self.layout is None:
+            return list(range(n_qubits))
+        if len(self.layout) < n_qubits:
+            raise ValueError(f"Layout has {len(self.layout)} qubits, {n_qubits} required")
+        return list(self.layout[:n_qubits])
+
+    @staticmethod
+    def build_circuit(n_qubits:int, n_layers:int, measurement:str, rotate:bool = True, measure:bool = True) -> QuantumCircuit:
+        """
+        Same construction as generate_hybrid_circuit_4_var in HybridDiscrimination.ipynb
+        """
+        n_copies = n_qubits*n_layers
+        circ = ExperimentCircuits(n_qubits)
+        circ.set_disc()
+
+        for _ in range(n_layers-1):
+            if rotate:
+                circ.qc.rz(np.pi/n_copies, range(n_qubits))
+            circ.qc.barrier()
+        if rotate:
+            circ.qc.rz(np.pi/n_copies, range(n_qubits))
+
+        if measurement == "SHORT":
+            circ.set_simple_premeas_rot_mtx(measure)
+        elif measurement == "XOR":
+            circ.set_XOR_premeas_rot_mtx(measure)
+        else:
+            raise ValueError(f"Unknown measurement type {measurement}, expected SHORT or XOR")
+
+        return circ.qc
+
+    def _instruction(self, name:str, qargs:tuple[int, ...]):
+        props = self.target[name]
+        if qargs in props:
+            return props[qargs], False
+        if len(qargs) == 2 and qargs[::-1] in props:
+            return props[qargs[::-1]], True
+        raise ValueError(f"Backend has no {name} on qubits {qargs}")
+
+    def circuit_cost(self, qc:QuantumCircuit) -> tuple[float, float]:
+        """
+        Returns (sum of -log(1 - gate error), duration in seconds) of ASAP schedule on the layout.
+        Reversed ECR direction is charged one extra SX on both qubits before and after the gate.
+        """
+        phys = self.physical_qubits(qc.num_qubits)
+        busy = np.zeros(qc.num_qubits)
+        log_fid = 0.0
+
+        for instruction in qc.data:
+            name = instruction.operation.name
+            qubits = [qc.find_bit(q).index for q in instruction.qubits]
+            if name == "barrier":
+                busy[qubits] = busy[qubits].max()
+                continue
+            if name == "measure":
+                continue
+
+            props, reversed_dir = self._instruction(name, tuple(phys[q] for q in qubits))
+            duration = props.duration or 0.0
+            log_fid -= np.log1p(-(props.error or 0.0))
+
+            if reversed_dir:
+                for q in qubits:
+                    sx_props, _ = self._instruction("sx", (phys[q],))
+                    log_fid -= 2*np.log1p(-(sx_props.error or 0.0))
+                duration += 2*max(self._instruction("sx", (phys[q],))[0].duration or 0.0 for q in qubits)
+
+            busy[qubits] = busy[qubits].max() + duration
+
+        return log_fid, float(busy.max())
+
+    @staticmethod
+    def _apply_readout(probs:np.ndarray, flip:np.ndarray) -> np.ndarray:
+        # index bit k belongs to qubit k, so tensor axis n-1-k belongs to qubit k
+        n_qubits = len(flip)
+        tensor = probs.reshape((2,)*n_qubits)
+        for k, f in enumerate(flip):
+            channel = np.array([[1-f, f], [f, 1-f]])
+            tensor = np.moveaxis(np.tensordot(channel, tensor, axes=([1], [n_qubits-1-k])), 0, n_qubits-1-k)
+        return tensor.reshape(-1)
+
+    @staticmethod
+    def _popcount(values:np.ndarray) -> np.ndarray:
+        return np.bitwise_count(values) if hasattr(np, "bitwise_count") else np.array([bin(v).count("1") for v in values.ravel()]).reshape(values.shape)
+
+    @classmethod
+    def _decision_weights(cls, n_qubits:int, measurement:str, rz_support:np.ndarray, id_support:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Probability of answering RZ / IDENT for every outcome, same rules as
+        TesterResultStorage.process_results_xor and process_results_short (ties are guessed)
+        """
+        outcomes = np.arange(2**n_qubits)
+        if measurement == "XOR":
+            # RZ is counted near all zeros, IDENT near all ones
+            dist_to_rz = cls._popcount(outcomes)
+            dist_to_id = n_qubits - dist_to_rz
+        else:
+            dist_to_rz = cls._popcount(outcomes[:, None] ^ rz_support[None, :]).min(axis=1)
+            dist_to_id = cls._popcount(outcomes[:, None] ^ id_support[None, :]).min(axis=1)
+
+        answer_rz = (dist_to_rz < dist_to_id) + 0.5*(dist_to_rz == dist_to_id)
+        return answer_rz, 1.0 - answer_rz
+
+    def _per_qubit_terms(self, n_qubits:int, measurement:str) -> tuple[float, ...]:
+        """
+        Returns layer independent and per layer -log fidelity and duration, success with perfect
+        gates but noisy readout and success on maximally mixed state.
+        Ideal distributions depend on n_qubits only, layers rotate by pi/n_qubits in total.
+        """
+        key = (n_qubits, measurement)
+        if key in self._per_qubit_cache:
+            return self._per_qubit_cache[key]
+
+        # cost is linear in layers, one layer = rz + barrier
+        log_fid_1, duration_1 = self.circuit_cost(self.build_circuit(n_qubits, 1, measurement))
+        log_fid_2, duration_2 = self.circuit_cost(self.build_circuit(n_qubits, 2, measurement))
+        layer_log_fid = log_fid_2 - log_fid_1
+        layer_duration = duration_2 - duration_1
+
+        rz_probs = Statevector(self.build_circuit(n_qubits, 1, measurement, True, False)).probabilities()
+        id_probs = Statevector(self.build_circuit(n_qubits, 1, measurement, False, False)).probabilities()
+
+        answer_rz, answer_id = self._decision_weights(
+            n_qubits, measurement, np.flatnonzero(rz_probs > 1e-9), np.flatnonzero(id_probs > 1e-9)
+        )
+
+        flip = np.array([self._instruction("measure", (q,))[0].error or 0.0 for q in self.physical_qubits(n_qubits)])
+        readout_success = 0.5*(self._apply_readout(rz_probs, flip) @ answer_rz + self._apply_readout(id_probs, flip) @ answer_id)
+        mixed_success = 0.5*(answer_rz.mean() + answer_id.mean())
+
+        self._per_qubit_cache[key] = (
+            log_fid_1 - layer_log_fid, layer_log_fid,
+            duration_1 - layer_duration, layer_duration,
+            float(readout_success), float(mixed_success)
+        )
+        return self._per_qubit_cache[key]
+
+    def _decoherence_rates(self, n_qubits:int) -> tuple[np.ndarray, np.ndarray]:
+        props = [self.target.qubit_properties[q] for q in self.physical_qubits(n_qubits)]
+        return np.array([1/p.t1 for p in props]), np.array([1/min(p.t2, 2*p.t1) for p in props])
+
+    def predict_grid(self, qubits:List[int], layers:List[int], measurement:str) -> np.ndarray:
+        """
+        Returns array of shape (len(qubits), len(layers)) with estimated probability of
+        correct identification (RZ and IDENT circuits equally likely).
+        Gate errors are depolarizing, idling is Pauli twirled T1/T2 over the whole circuit
+        duration and readout is independent symmetric bit flip per qubit.
+        A layer is only virtual RZ and barrier (zero error and duration on IBM targets), so
+        layer_log_fid and layer_duration are 0 and the grid is constant along layers:
+        the prediction prunes Q, not L.
+        """
+        layers = np.asarray(layers, dtype=float)
+        terms = np.array([self._per_qubit_terms(int(n_qubits), measurement) for n_qubits in qubits]).reshape(-1, 6)
+        base_log_fid, layer_log_fid, base_duration, layer_duration, readout_success, mixed_success = terms.T
+
+        # unused qubits are padded with zero rates, their idle fidelity is 1
+        max_qubits = max(qubits)
+        rate_1 = np.zeros((len(qubits), max_qubits))
+        rate_2 = np.zeros((len(qubits), max_qubits))
+        for i, n_qubits in enumerate(qubits):
+            rate_1[i, :n_qubits], rate_2[i, :n_qubits] = self._decoherence_rates(int(n_qubits))
+
+        log_fid = base_log_fid[:, None] + layers[None, :]*layer_log_fid[:, None]
+        duration = (base_duration[:, None] + layers[None, :]*layer_duration[:, None])[:, :, None]
+
+        idle_fid = np.prod((1 + np.exp(-duration*rate_1[:, None, :]) + 2*np.exp(-duration*rate_2[:, None, :]))/4, axis=2)
+        fidelity = np.exp(-log_fid)*idle_fid
+
+        return fidelity*readout_success[:, None] + (1 - fidelity)*mixed_success[:, None]
+
+    def predict_names(self, names:List[str]) -> Dict[str, float]:
+        """
+        Returns prediction keyed as in TesterResultStorage.processed_results (Q<n>L<m>),
+        names follow Q<n_qubits>_L<m_layers>_{RZ,IDENT}_{SHORT,XOR}
+        """
+        pattern = r'Q(\d+)_L(\d+)_.*_(SHORT|XOR)'
+        prediction = {}
+        for name in names:
+            q_num, l_num, measurement = re.match(pattern, name).groups()
+            ident = f'Q{q_num}L{l_num}'
+            if ident not in prediction:
+                prediction[ident] = float(self.predict_grid([int(q_num)], [int(l_num)], measurement)[0, 0])
+        return prediction
+
+    def compare_with_storage(self, storage:TesterResultStorage, measurement:str) -> Dict[str, tuple[float, float]]:
+        """
+        storage has to contain single measurement type, returns ident -> (predicted, measured)
+        """
+        if measurement == "SHORT":
+            processed = storage.process_results_short()
+        else:
+            processed = storage.process_results_xor()
+
+        measured = TesterResultStorage.success_probabilities(processed)
+        predicted = self.predict_names(storage.names)
+        return {ident: (predicted[ident], measured[ident]) for ident in measured}
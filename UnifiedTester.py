@@ -2,289 +2,60 @@ from __future__ import annotations
 
 import os
 import json
-from typing import List, Dict
-import re
-from copy import deepcopy
+import hashlib
+from typing import TYPE_CHECKING
 
-from qiskit import QuantumCircuit
-from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
-from qiskit.providers import BackendV2
-from qiskit_ibm_runtime import SamplerV2
-from qiskit_aer import AerSimulator
+from ResultStorage import TesterResultStorage, SXResultStorage
 
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+    from qiskit.providers import BackendV2
 
-class TesterResultStorage:
-    def __init__(self, names: List[str], simulated_counts: List[Dict[str, int]], real_counts: List[Dict[str, int]]) -> None:
-        '''
-        Assumes name format Q<n_qubits>_L<m_layers>_{RZ,IDENT}_{SHORT,XOR}
-        '''
-        self.names = names
-        self.simulated_counts = simulated_counts
-        self.real_counts = real_counts
-        self.processed_results = None
-
-    def copy(self) -> TesterResultStorage:
-        return TesterResultStorage(
-            deepcopy(self.names),
-            deepcopy(self.simulated_counts),
-            deepcopy(self.real_counts)
-        )
-
-    def save_to_directory(self, directory: str):
-        os.makedirs(directory, exist_ok=True)
-        
-        with open(os.path.join(directory, "names.json"), "w") as f:
-            json.dump(self.names, f)
-        
-        with open(os.path.join(directory, "simulated_counts.json"), "w") as f:
-            json.dump(self.simulated_counts, f)
-        
-        with open(os.path.join(directory, "real_counts.json"), "w") as f:
-            json.dump(self.real_counts, f)
-
-    @classmethod
-    def load_from_directory(cls, directory: str):
-        with open(os.path.join(directory, "names.json"), "r") as f:
-            names = json.load(f)
-        
-        with open(os.path.join(directory, "simulated_counts.json"), "r") as f:
-            simulated_counts = json.load(f)
-        
-        with open(os.path.join(directory, "real_counts.json"), "r") as f:
-            real_counts = json.load(f)
-        
-        return cls(names, simulated_counts, real_counts)
-
-    @classmethod
-    def from_unified_tester(cls, tester:UnifiedTester):
-        if tester.real_counts == None:
-            assert "UnifiedTester has no real counts"
-        
-        return cls(tester.circuit_names, tester.sim_counts, tester.real_counts)
-
-    @staticmethod
-    def counts_within_xor_dist(counts: Dict[str,int], origin: str, dist: int) -> int:
-        final = 0
-        for bitstring, count in counts.items():
-            hamming_distance = sum(bit1 != bit2 for bit1, bit2 in zip(bitstring, origin))
-            if hamming_distance <= dist:
-                final = final + count
-        return final
-    
-    @staticmethod
-    def counts_at_xor_dist(counts: Dict[str,int], origin: str, dist: int) -> int:
-        final = 0
-        for bitstring, count in counts.items():
-            hamming_distance = sum(bit1 != bit2 for bit1, bit2 in zip(bitstring, origin))
-            if hamming_distance == dist:
-                final = final + count
-        return final
-    
-    @staticmethod
-    def hamming_distance_to_set(string_set: set[str], origin: str) -> int:
-        final = len(origin)
-        for bitstring in string_set:
-            hamming_distance = sum(bit1 != bit2 for bit1, bit2 in zip(bitstring, origin))
-            if hamming_distance < final:
-                final = hamming_distance
-        return final
-    
-    
-    def process_results_xor(self):
-        """
-        Consider all ones as identity and zeros as rotation
-        Corectly identifying RZ is true positive
-        Corectly identifying I is true negative
-        Correct results is RZ, but is identified as I is false negative
-        Correct results is I, but is identified as RZ is false positive
-        Also computes random guess towards either I or RZ which cant be determined (G prefix)
-        """
-        pattern = r'Q(\d+)_L(\d+)_.*' # reg exp pattern for n of qubits and layers extraction
-
-        self.processed_results = {}
-        
-        for i,name in enumerate(self.names):
-            q_num, l_num = re.match(pattern, name).groups()
-
-            ident = f'Q{q_num}L{l_num}'
-
-            self.processed_results[ident] = {}
-
-        for i,name in enumerate(self.names):
-            q_num, l_num = re.match(pattern, name).groups()
-            
-            ident = f'Q{q_num}L{l_num}'
-
-            n_qubits = int(q_num)
-
-            bin_clas_dict = self.processed_results[ident]
-
-            if "TP" not in bin_clas_dict.keys():
-                bin_clas_dict["TP"] = 0
-            if "FN" not in bin_clas_dict.keys():
-                bin_clas_dict["FN"] = 0
-            if "TN" not in bin_clas_dict.keys():
-                bin_clas_dict["TN"] = 0
-            if "FP" not in bin_clas_dict.keys():
-                bin_clas_dict["FP"] = 0
-            
-            if "RZ" in name:
-                bin_clas_dict["TP"] = self.counts_within_xor_dist(self.real_counts[i], "0"*n_qubits, (n_qubits-1)//2)
-                bin_clas_dict["FN"] = self.counts_within_xor_dist(self.real_counts[i], "1"*n_qubits, (n_qubits-1)//2)
-            if "IDENT" in name:
-                bin_clas_dict["TN"] = self.counts_within_xor_dist(self.real_counts[i], "1"*n_qubits, (n_qubits-1)//2)
-                bin_clas_dict["FP"] = self.counts_within_xor_dist(self.real_counts[i], "0"*n_qubits, (n_qubits-1)//2)  
-            
-            if "GTP" not in bin_clas_dict.keys():
-                bin_clas_dict["GTP"] = 0
-            if "GFN" not in bin_clas_dict.keys():
-                bin_clas_dict["GFN"] = 0
-            if "GTN" not in bin_clas_dict.keys():
-                bin_clas_dict["GTN"] = 0
-            if "GFP" not in bin_clas_dict.keys():
-                bin_clas_dict["GFP"] = 0
-
-            if n_qubits % 2 == 0:
-                # random guess for strings with same nuber of zeros and ones
-                counts_to_guess = self.counts_at_xor_dist(self.real_counts[i], "0"*n_qubits, n_qubits//2)
-                if "RZ" in name:
-                    bin_clas_dict["GTP"] = counts_to_guess // 2
-                    bin_clas_dict["GFN"] = counts_to_guess - bin_clas_dict["GTP"]
-                if "IDENT" in name:
-                    bin_clas_dict["GTN"] = counts_to_guess // 2
-                    bin_clas_dict["GFP"] = counts_to_guess - bin_clas_dict["GTN"]
-
-            self.processed_results[ident] = bin_clas_dict
-
-
-        return self.processed_results
-    
-
-    def process_results_short(self):
-        """
-        Corectly identifying RZ is true positive
-        Corectly identifying I is true negative
-        Correct results is RZ, but is identified as I is false negative
-        Correct results is I, but is identified as RZ is false positive
-        Also computes random guess towards either I or RZ which cant be determined (G prefix)
-        """
-        pattern = r'Q(\d+)_L(\d+)_.*' # reg exp pattern for n of qubits and layers extraction
-
-        self.processed_results = {}
-        rz_combinations = {}
-        id_combinations = {}
-
-        for i,name in enumerate(self.names):
-            q_num, l_num = re.match(pattern, name).groups()
-
-            circuit_idx = f'Q{q_num}L{l_num}'
-
-            self.processed_results[circuit_idx] = {}
-            rz_combinations[circuit_idx] = set()
-            id_combinations[circuit_idx] = set()
-
-        for i,name in enumerate(self.names):
-            q_num, l_num = re.match(pattern, name).groups()
-
-            circuit_idx = f'Q{q_num}L{l_num}'
-
-            if "RZ" in name:
-                rz_combinations[circuit_idx] = rz_combinations[circuit_idx].union(set(self.simulated_counts[i].keys()))
-
-            if "IDENT" in name:
-                id_combinations[circuit_idx] = id_combinations[circuit_idx].union(set(self.simulated_counts[i].keys()))
-
-        for i,name in enumerate(self.names):
-            q_num, l_num = re.match(pattern, name).groups()
-            
-            circuit_idx = f'Q{q_num}L{l_num}'
-
-            bin_clas_dict = self.processed_results[circuit_idx]
-
-            if "TP" not in bin_clas_dict.keys():
-                bin_clas_dict["TP"] = 0
-            if "FN" not in bin_clas_dict.keys():
-                bin_clas_dict["FN"] = 0
-            if "TN" not in bin_clas_dict.keys():
-                bin_clas_dict["TN"] = 0
-            if "FP" not in bin_clas_dict.keys():
-                bin_clas_dict["FP"] = 0
-
-            if "GTP" not in bin_clas_dict.keys():
-                bin_clas_dict["GTP"] = 0
-            if "GFN" not in bin_clas_dict.keys():
-                bin_clas_dict["GFN"] = 0
-            if "GTN" not in bin_clas_dict.keys():
-                bin_clas_dict["GTN"] = 0
-            if "GFP" not in bin_clas_dict.keys():
-                bin_clas_dict["GFP"] = 0
-            
-
-            if "RZ" in name:
-                counts_rz = 0
-                counts_id = 0
-
-                # random guess for strings that have same distance from both answears
-                counts_to_guess = 0
-
-                for key in self.real_counts[i]:
-                    dist_to_rz = self.hamming_distance_to_set(rz_combinations[circuit_idx], key)
-                    dist_to_id = self.hamming_distance_to_set(id_combinations[circuit_idx], key)
-
-                    if dist_to_rz < dist_to_id:
-                        counts_rz += self.real_counts[i][key] 
-                    elif dist_to_rz > dist_to_id:
-                        counts_id += self.real_counts[i][key]
-                    else:
-                        counts_to_guess += self.real_counts[i][key]
-
-                bin_clas_dict["TP"] += counts_rz
-                bin_clas_dict["FN"] += counts_id
-                bin_clas_dict["GTP"] += counts_to_guess // 2
-                bin_clas_dict["GFN"] += counts_to_guess - counts_to_guess // 2
-            
-            if "IDENT" in name:
-                counts_rz = 0
-                counts_id = 0
-
-                # random guess for strings that have same distance from both answears
-                counts_to_guess = 0
-
-                for key in self.real_counts[i]:
-                    dist_to_rz = self.hamming_distance_to_set(rz_combinations[circuit_idx], key)
-                    dist_to_id = self.hamming_distance_to_set(id_combinations[circuit_idx], key)
-
-                    if dist_to_rz < dist_to_id:
-                        counts_rz += self.real_counts[i][key] 
-                    elif dist_to_rz > dist_to_id:
-                        counts_id += self.real_counts[i][key]
-                    else:
-                        counts_to_guess += self.real_counts[i][key]
-
-                bin_clas_dict["TN"] += counts_id
-                bin_clas_dict["FP"] += counts_rz
-                bin_clas_dict["GTN"] = counts_to_guess // 2
-                bin_clas_dict["GFP"] = counts_to_guess - counts_to_guess // 2
-
-
-            self.processed_results[circuit_idx] = bin_clas_dict
-
-        return self.processed_results
-
+"""
+qiskit, qiskit_ibm_runtime and qiskit_aer are imported on first use, importing this module
+for TesterResultStorage alone stays fast.
+"""
 
 class UnifiedTester:
-    def __init__(self, circuits:list[QuantumCircuit], backend:BackendV2, optimization_level:int, circuit_names:list[str] = [], sim_shots = 10000) -> None:
+    def __init__(self, circuits:list[QuantumCircuit], backend:BackendV2, optimization_level:int, circuit_names:list[str] = [], sim_shots = 10000, use_chain_layout:bool = False, checkpoint_dir:str | None = None, deduplicate:bool = False, ignore_barriers:bool = True, pool_shots:bool = False, seed:int | None = None) -> None:
         '''
         elements of circuits and circuit_names should match one to one
         standard naming convection is Q<n_qubits>_L<m_layers>_{RZ,IDENT}_{SHORT,XOR}
+        use_chain_layout places every circuit on the best calibrated linear chain of the backend
+        (see PhysicalChainIndex), so no layout search and no SWAPs are needed
+        checkpoint_dir stores state after every stage, use UnifiedTester.resume(checkpoint_dir, backend)
+        deduplicate executes circuits with same ISA structure (barriers skipped when ignore_barriers) once
+        and copies counts to every name, with pool_shots the unique circuit gets shots of all its copies
+        and the counts are split among them, seed of the split is drawn once when missing and
+        checkpointed, so repeated collection of the same job gives the same split
         '''
+        from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
+        from qiskit_ibm_runtime import SamplerV2
+
         self.circuits = circuits
         self.circuit_names = circuit_names
         self.n_circ = len(self.circuits)
-        self.pm = generate_preset_pass_manager(backend = backend, optimization_level=optimization_level)
         self.sampler = SamplerV2(backend)
+        self.checkpoint_dir = checkpoint_dir
 
-        self.isa_circuits = self.pm.run(circuits)
+        self.pm = None
+        self.chain_layouts = None
+        if use_chain_layout:
+            self.isa_circuits = self._transpile_on_chains(backend, optimization_level)
+        else:
+            self.pm = generate_preset_pass_manager(backend = backend, optimization_level=optimization_level)
+            self.isa_circuits = self.pm.run(circuits)
+
+        self.pool_shots = pool_shots
+        if seed is None:
+            import numpy as np
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        self.seed = seed
+        if deduplicate:
+            self.circuit_map, self.unique_indices = self.deduplicate(self.isa_circuits, ignore_barriers)
+        else:
+            self.circuit_map, self.unique_indices = list(range(self.n_circ)), list(range(self.n_circ))
+        self._checkpoint_circuits()
 
         self.sim_counts = None
         self.sim_results(sim_shots)
@@ -292,13 +63,203 @@ class UnifiedTester:
         self.job = None
         self.real_counts = None
 
+    @classmethod
+    def resume(cls, path:str, backend:BackendV2, service = None, sim_shots = 10000) -> UnifiedTester:
+        '''
+        Restores tester from checkpoint_dir, completed stages are skipped.
+        Running job is reattached through service (QiskitRuntimeService), backend.service is used when missing,
+        ValueError is raised when checkpointed job without counts cannot be reattached
+        '''
+        from qiskit import qpy
+        from qiskit_ibm_runtime import SamplerV2
+
+        tester = cls.__new__(cls)
+        tester.checkpoint_dir = path
+        tester.sampler = SamplerV2(backend)
+        tester.pm = None
+
+        with open(os.path.join(path, "circuits.qpy"), "rb") as f:
+            tester.circuits = qpy.load(f)
+        with open(os.path.join(path, "isa_circuits.qpy"), "rb") as f:
+            tester.isa_circuits = qpy.load(f)
+        with open(os.path.join(path, "names.json"), "r") as f:
+            tester.circuit_names = json.load(f)
+        with open(os.path.join(path, "layouts.json"), "r") as f:
+            layouts = json.load(f)
+            tester.chain_layouts = None if layouts is None else {int(n): chain for n, chain in layouts.items()}
+        tester.n_circ = len(tester.circuits)
+
+        dedup_info = tester._load_checkpoint("dedup.json")
+        if dedup_info is None:
+            dedup_info = {"unique_indices": list(range(tester.n_circ)), "pool_shots": False}
+        # circuit_map.json is shared with TesterResultStorage.load_from_directory
+        tester.circuit_map = tester._load_checkpoint("circuit_map.json")
+        if tester.circuit_map is None:
+            tester.circuit_map = dedup_info.get("circuit_map", list(range(tester.n_circ)))
+        tester.unique_indices = dedup_info["unique_indices"]
+        tester.pool_shots = dedup_info["pool_shots"]
+        tester.seed = dedup_info.get("seed")
+
+        tester.sim_counts = tester._load_checkpoint("simulated_counts.json")
+        tester.sim_results(sim_shots)
+
+        tester.job = None
+        tester.real_counts = tester._load_checkpoint("real_counts.json")
+        job_info = tester._load_checkpoint("job.json")
+
+        if job_info is not None and tester.real_counts is None:
+            if service is None:
+                service = getattr(backend, "service", None)
+            # leaving job None would let run_job submit (and checkpoint) a second QPU job
+            if service is None:
+                raise ValueError(f"Cannot reattach job {job_info['job_id']} of {path}, backend has no service, pass service=QiskitRuntimeService()")
+            tester.job = service.job(job_info["job_id"])
+            print(f">>> Reattached job ID: {job_info['job_id']}")
+
+        return tester
+
+    def _load_checkpoint(self, file_name:str):
+        file_path = os.path.join(self.checkpoint_dir, file_name)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, "r") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, file_name:str, data) -> None:
+        if self.checkpoint_dir is None:
+            return
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        # write to temporary file first so dead kernel does not leave broken checkpoint
+        file_path = os.path.join(self.checkpoint_dir, file_name)
+        with open(file_path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(file_path + ".tmp", file_path)
+
+    def _checkpoint_circuits(self) -> None:
+        if self.checkpoint_dir is None:
+            return
+        from qiskit import qpy
+
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        for file_name, circuits in (("circuits.qpy", self.circuits), ("isa_circuits.qpy", self.isa_circuits)):
+            file_path = os.path.join(self.checkpoint_dir, file_name)
+            with open(file_path + ".tmp", "wb") as f:
+                qpy.dump(circuits, f)
+            os.replace(file_path + ".tmp", file_path)
+        self._save_checkpoint("names.json", self.circuit_names)
+        self._save_checkpoint("layouts.json", self.chain_layouts)
+        self._save_checkpoint("circuit_map.json", self.circuit_map)
+        self._save_checkpoint("dedup.json", {
+            "unique_indices": self.unique_indices,
+            "pool_shots": self.pool_shots,
+            "seed": self.seed
+        })
+
+    @staticmethod
+    def circuit_hash(qc:QuantumCircuit, ignore_barriers:bool = True) -> str:
+        """
+        Hash of classical registers and instruction sequence (name, qubits, clbits, params),
+        ISA circuits are compared on physical qubits
+        """
+        # count keys depend on clbit width and register names (meas for measure_all)
+        canonical = [qc.num_clbits, [(creg.name, creg.size) for creg in qc.cregs]]
+        for instruction in qc.data:
+            name = instruction.operation.name
+            if ignore_barriers and name == "barrier":
+                continue
+            canonical.append((
+                name,
+                [qc.find_bit(q).index for q in instruction.qubits],
+                [qc.find_bit(c).index for c in instruction.clbits],
+                [round(float(p), 12) for p in instruction.operation.params]
+            ))
+        return hashlib.sha256(json.dumps(canonical).encode()).hexdigest()
+
+    @classmethod
+    def deduplicate(cls, circuits:list[QuantumCircuit], ignore_barriers:bool = True) -> tuple[list[int], list[int]]:
+        """
+        Returns (circuit_map, unique_indices), circuits[i] is executed as circuits[unique_indices[circuit_map[i]]]
+        """
+        circuit_map = []
+        unique_indices = []
+        hash_to_unique = {}
+        for i, qc in enumerate(circuits):
+            key = cls.circuit_hash(qc, ignore_barriers)
+            if key not in hash_to_unique:
+                hash_to_unique[key] = len(unique_indices)
+                unique_indices.append(i)
+            circuit_map.append(hash_to_unique[key])
+        return circuit_map, unique_indices
+
+    def _fan_out(self, unique_counts:list[dict[str, int]], split:bool) -> list[dict[str, int]]:
+        """
+        Copies counts of unique circuits to all names, split divides pooled counts into
+        disjoint random parts (multivariate hypergeometric) as if every copy was run separately
+        """
+        import numpy as np
+
+        parts = {}
+        if split:
+            rng = np.random.default_rng(self.seed)
+            for j, counts in enumerate(unique_counts):
+                n_copies = self.circuit_map.count(j)
+                bitstrings = list(counts.keys())
+                remaining = np.array([counts[b] for b in bitstrings])
+                parts[j] = []
+                for k in range(n_copies, 0, -1):
+                    part = rng.multivariate_hypergeometric(remaining, remaining.sum() // k)
+                    remaining = remaining - part
+                    parts[j].append({b: int(c) for b, c in zip(bitstrings, part) if c > 0})
+
+        fanned = []
+        for j in self.circuit_map:
+            if split:
+                fanned.append(parts[j].pop(0))
+            else:
+                fanned.append(dict(unique_counts[j]))
+        return fanned
+
+    def _transpile_on_chains(self, backend:BackendV2, optimization_level:int) -> list[QuantumCircuit]:
+        """
+        initial_layout depends on circuit width, so circuits are transpiled in groups of same width
+        """
+        from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
+        from PhysicalChainIndex import PhysicalChainIndex
+
+        chain_index = PhysicalChainIndex.for_backend(backend)
+        self.chain_layouts = {}
+
+        groups = {}
+        for i, qc in enumerate(self.circuits):
+            groups.setdefault(qc.num_qubits, []).append(i)
+
+        isa_circuits = [None] * self.n_circ
+        for n_qubits, indices in groups.items():
+            self.chain_layouts[n_qubits] = chain_index.best_chain(n_qubits)
+            pm = generate_preset_pass_manager(
+                backend = backend,
+                optimization_level=optimization_level,
+                initial_layout=self.chain_layouts[n_qubits]
+            )
+            for i, isa_qc in zip(indices, pm.run([self.circuits[i] for i in indices])):
+                isa_circuits[i] = isa_qc
+
+        return isa_circuits
+
     def run_job(self, shots = 10000):
         if self.job != None:
             print("Cannot run multiple jobs per tester")
             return None
 
-        self.job = self.sampler.run(self.isa_circuits, shots = shots) # bulk run
+        unique_circuits = [self.isa_circuits[i] for i in self.unique_indices]
+        if self.pool_shots:
+            pubs = [(qc, None, shots*self.circuit_map.count(j)) for j, qc in enumerate(unique_circuits)]
+            self.job = self.sampler.run(pubs) # bulk run
+        else:
+            self.job = self.sampler.run(unique_circuits, shots = shots) # bulk run
         print(f">>> Job ID: {self.job.job_id()}")
+        # j-th pub of job belongs to circuit unique_indices[j]
+        self._save_checkpoint("job.json", {"job_id": self.job.job_id(), "circuit_indices": self.unique_indices})
 
     def job_status(self):
         if self.job == None:
@@ -311,6 +272,41 @@ class UnifiedTester:
         
         print("Job finnished")
  
+    def _counts_from_result(self, job_result, job_id:str) -> list[dict[str, int]]:
+        """
+        Maps pubs of job to circuit names, job either has one pub per unique circuit (fanned out)
+        or one pub per circuit (job submitted without deduplication)
+        """
+        n_pubs = len(job_result)
+        circuit_indices = None
+        job_info = self._load_checkpoint("job.json") if self.checkpoint_dir is not None else None
+        if job_info is not None and job_info["job_id"] == job_id:
+            circuit_indices = job_info.get("circuit_indices")
+        if circuit_indices is None:
+            if n_pubs == len(self.unique_indices):
+                circuit_indices = self.unique_indices
+            elif n_pubs == self.n_circ:
+                circuit_indices = list(range(self.n_circ))
+            else:
+                raise ValueError(f"Job {job_id} has {n_pubs} pubs, tester expects {len(self.unique_indices)} (unique circuits) or {self.n_circ} (all circuits)")
+
+        if circuit_indices != self.unique_indices and circuit_indices != list(range(self.n_circ)):
+            raise ValueError(f"circuit_indices of job {job_id} in job.json do not match unique circuits or all circuits of tester")
+        if len(circuit_indices) != n_pubs:
+            raise ValueError(f"Job {job_id} has {n_pubs} pubs, job.json lists {len(circuit_indices)} circuits")
+
+        counts = []
+        for j in range(n_pubs):
+            if hasattr(job_result[j], 'data'):
+                counts.append(job_result[j].data.meas.get_counts())
+            else:
+                counts.append(job_result[j]["__value__"]["data"].meas.get_counts())
+
+        self._save_checkpoint("job.json", {"job_id": job_id, "circuit_indices": circuit_indices})
+        if circuit_indices == self.unique_indices:
+            return self._fan_out(counts, self.pool_shots)
+        return counts
+
     def collect_counts_from_job(self) -> list[dict[str, int]] | None:
         if self.real_counts != None:
             print("Counts already collected")
@@ -324,16 +320,8 @@ class UnifiedTester:
             print("Cannot process running job")
             return None
         
-        job_result = self.job.result()
-        
-        self.real_counts = []
-        if hasattr(job_result[0], 'data'):
-            for i in range(self.n_circ):
-                self.real_counts.append(job_result[i].data.meas.get_counts())
-        else:
-            for i in range(self.n_circ):
-                self.real_counts.append(job_result[i]["__value__"]["data"].meas.get_counts())
-
+        self.real_counts = self._counts_from_result(self.job.result(), self.job.job_id())
+        self._save_checkpoint("real_counts.json", self.real_counts)
         return self.real_counts
     
     def collect_counts_from_ext_job(self, ext_job) -> list[dict[str, int]] | None:
@@ -341,25 +329,29 @@ class UnifiedTester:
             print("Provided job is None")
             return None
         
-        job_result = ext_job.result()
-        
-        self.real_counts = []
-        for i in range(self.n_circ):
-            self.real_counts.append(job_result[i]["__value__"]["data"].meas.get_counts())
+        self.real_counts = self._counts_from_result(ext_job.result(), ext_job.job_id())
 
+        self._save_checkpoint("real_counts.json", self.real_counts)
         return self.real_counts
         
     def sim_results(self,shots=100000) -> list[dict[str, int]]:
         if self.sim_counts != None:
             return self.sim_counts
         
-        self.sim_counts = []
+        from qiskit_ibm_runtime import SamplerV2
+        from qiskit_aer import AerSimulator
+
+        unique_counts = []
 
         simulator = AerSimulator()
         sim_sampler = SamplerV2(simulator)
-        sim_job = sim_sampler.run(self.isa_circuits, shots = shots) # bulk run
+        sim_job = sim_sampler.run([self.isa_circuits[i] for i in self.unique_indices], shots = shots) # bulk run
+
+        for j in range(len(self.unique_indices)):
+            unique_counts.append(sim_job.result()[j].data.meas.get_counts())
 
-        for i in range(self.n_circ):
-            self.sim_counts.append(sim_job.result()[i].data.meas.get_counts())
+        # ideal counts only define supports, no need to split them
+        self.sim_counts = self._fan_out(unique_counts, False)
 
+        self._save_checkpoint("simulated_counts.json", self.sim_counts)
         return self.sim_counts